@@ -7,9 +7,14 @@ Purpose:
 - Reproduce selective feedback realistically
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from numba import njit
 
 
 # -----------------------------
@@ -22,6 +27,10 @@ N_USERS = 1000
 N_ITEMS = 50
 N_EVENTS = 20000
 
+# Events sampled per chunk; chunks run in parallel. Each chunk allocates two
+# (chunk, N_ITEMS) float64 buffers (scores, Gumbel keys): ~4MB per thread.
+CHUNK_EVENTS = 5_000
+
 RANDOM_SEED = 42
 
 
@@ -29,7 +38,7 @@ RANDOM_SEED = 42
 # True Reward Model (Hidden)
 # -----------------------------
 
-def true_reward_prob(user_pref: float, item_attr: float) -> float:
+def true_reward_prob(user_pref: np.ndarray, item_attr: np.ndarray) -> np.ndarray:
     """
     Ground-truth reward probability (unknown to the learner).
     """
@@ -41,54 +50,129 @@ def true_reward_prob(user_pref: float, item_attr: float) -> float:
 # Logging Policy
 # -----------------------------
 
-def logging_policy_scores(user_pref: float, item_attrs: np.ndarray) -> np.ndarray:
+def logging_policy_scores(
+    user_prefs: np.ndarray,
+    item_attrs: np.ndarray,
+    rng: np.random.Generator,
+) -> np.ndarray:
     """
     Biased logging policy (over-exploits high-score items).
+
+    Returns an (n_events, n_items) score matrix, one row per event.
     """
-    noise = np.random.normal(0, 0.3, size=len(item_attrs))
-    return user_pref * item_attrs + noise
+    scores = rng.standard_normal((len(user_prefs), len(item_attrs)))
+    scores *= 0.3
+    scores += user_prefs[:, None] * item_attrs[None, :]
+    return scores
+
 
+@njit(nogil=True)
+def _sample_actions(scores, gumbel):
+    """
+    Per event: sample an action from softmax(scores) via Gumbel-max and
+    return it with its logging propensity. Releases the GIL so chunks
+    run concurrently.
+    """
+    n, m = scores.shape
+    actions = np.empty(n, dtype=np.int64)
+    propensity = np.empty(n, dtype=np.float64)
 
-def softmax(x: np.ndarray) -> np.ndarray:
-    e = np.exp(x - np.max(x))
-    return e / e.sum()
+    for i in range(n):
+        row_max = scores[i, 0]
+        best = 0
+        best_key = scores[i, 0] + gumbel[i, 0]
+        for j in range(1, m):
+            if scores[i, j] > row_max:
+                row_max = scores[i, j]
+            key = scores[i, j] + gumbel[i, j]
+            if key > best_key:
+                best = j
+                best_key = key
+
+        total = 0.0
+        for j in range(m):
+            total += np.exp(scores[i, j] - row_max)
+
+        actions[i] = best
+        propensity[i] = np.exp(scores[i, best] - row_max) / total
+
+    return actions, propensity
 
 
 # -----------------------------
 # Data Generation
 # -----------------------------
 
-def generate_logged_data() -> pd.DataFrame:
-    np.random.seed(RANDOM_SEED)
+def _sample_chunk(
+    event_prefs: np.ndarray,
+    item_attrs: np.ndarray,
+    seed_seq: np.random.SeedSequence,
+):
+    """
+    Sample actions, propensities and rewards for one chunk of events
+    from the chunk's own Generator.
+    """
+    rng = np.random.default_rng(seed_seq)
+
+    scores = logging_policy_scores(event_prefs, item_attrs, rng)
+    gumbel = rng.gumbel(size=scores.shape)
+    actions, propensity = _sample_actions(scores, gumbel)
+
+    reward_prob = true_reward_prob(event_prefs, item_attrs[actions])
+    rewards = rng.binomial(1, reward_prob)
+
+    return actions, propensity, rewards
+
+
+def generate_logged_columns(seed: int = RANDOM_SEED) -> Dict[str, np.ndarray]:
+    """
+    Sample all logged events; returns one array per output column.
+
+    Each chunk draws from its own Generator spawned from the seed, and
+    chunks run on a thread pool (NumPy draws and the kernel release the
+    GIL). Output is deterministic for a given seed and CHUNK_EVENTS,
+    regardless of thread count.
+    """
+    seed_seq = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_seq)
 
-    user_prefs = np.random.uniform(-1, 1, size=N_USERS)
-    item_attrs = np.random.uniform(-1, 1, size=N_ITEMS)
+    user_prefs = rng.uniform(-1, 1, size=N_USERS)
+    item_attrs = rng.uniform(-1, 1, size=N_ITEMS)
 
-    records = []
+    user_ids = rng.integers(0, N_USERS, size=N_EVENTS)
+    event_prefs = user_prefs[user_ids]
 
-    for _ in range(N_EVENTS):
-        user_id = np.random.randint(0, N_USERS)
-        user_pref = user_prefs[user_id]
+    pref_chunks = [
+        event_prefs[start:start + CHUNK_EVENTS]
+        for start in range(0, N_EVENTS, CHUNK_EVENTS)
+    ]
+    chunk_seqs = seed_seq.spawn(len(pref_chunks))
 
-        scores = logging_policy_scores(user_pref, item_attrs)
-        probs = softmax(scores)
+    with ThreadPoolExecutor() as pool:
+        chunks = list(pool.map(
+            _sample_chunk,
+            pref_chunks,
+            [item_attrs] * len(pref_chunks),
+            chunk_seqs,
+        ))
 
-        action = np.random.choice(N_ITEMS, p=probs)
-        propensity = probs[action]
+    actions = np.concatenate([c[0] for c in chunks])
+    propensity = np.concatenate([c[1] for c in chunks])
+    rewards = np.concatenate([c[2] for c in chunks])
+    action_attrs = item_attrs[actions]
 
-        reward_prob = true_reward_prob(user_pref, item_attrs[action])
-        reward = np.random.binomial(1, reward_prob)
+    return {
+        "user_id": user_ids,
+        "action": actions,
+        "reward": rewards,
+        "propensity": propensity,
+        "user_pref": event_prefs,
+        "item_attr": action_attrs,
+    }
 
-        records.append({
-            "user_id": user_id,
-            "action": action,
-            "reward": reward,
-            "propensity": propensity,
-            "user_pref": user_pref,
-            "item_attr": item_attrs[action],
-        })
 
-    return pd.DataFrame(records)
+def generate_logged_data(seed: int = RANDOM_SEED) -> pd.DataFrame:
+    return pd.DataFrame(generate_logged_columns(seed))
 
 
 # -----------------------------
@@ -96,9 +180,10 @@ def generate_logged_data() -> pd.DataFrame:
 # -----------------------------
 
 if __name__ == "__main__":
-    df = generate_logged_data()
+    # Arrays go straight to Arrow; no intermediate DataFrame
+    table = pa.table(generate_logged_columns())
     OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(OUTPUT_PATH, index=False)
+    pq.write_table(table, OUTPUT_PATH)
 
-    print(f"Generated {len(df)} logged events")
+    print(f"Generated {table.num_rows} logged events")
     print(f"Saved to {OUTPUT_PATH}")
@@ -8,20 +8,60 @@ Implements:
 This module evaluates ranking *policies* using logged bandit feedback.
 """
 
-from typing import Callable, Dict
+from typing import Callable, Tuple, Union
 import numpy as np
 import pandas as pd
 
 
+# Vectorized policy contract: maps the logged frame to one action per row.
+PolicyFn = Callable[[pd.DataFrame], np.ndarray]
+
+
 # -----------------------------
 # Utilities
 # -----------------------------
 
-def clip_propensity(p: float, epsilon: float = 0.01) -> float:
+def clip_propensity(
+    p: Union[float, np.ndarray],
+    epsilon: float = 0.01,
+) -> Union[float, np.ndarray]:
     """
     Prevent extreme importance weights.
     """
-    return max(p, epsilon)
+    return np.maximum(p, epsilon)
+
+
+def scalar_policy(policy_fn: Callable[[pd.Series], int]) -> PolicyFn:
+    """
+    Wrap a legacy row-wise policy into the vectorized contract.
+
+    The wrapped policy keeps its original contract: one pd.Series per
+    row (e.g. `row["action"]`). This is a compatibility path; write
+    vectorized policies where evaluation speed matters.
+    """
+    def vectorized(df: pd.DataFrame) -> np.ndarray:
+        actions = df.apply(policy_fn, axis=1, result_type="reduce")
+        return actions.to_numpy(dtype=np.int64)
+
+    return vectorized
+
+
+def _matched_weights(
+    df: pd.DataFrame,
+    policy_fn: PolicyFn,
+    epsilon: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Importance weights (zero where the policy disagrees with the log)
+    and observed rewards, as flat column arrays.
+    """
+    actions = df["action"].to_numpy()
+    policy_actions = np.broadcast_to(np.asarray(policy_fn(df)), actions.shape)
+
+    props = clip_propensity(df["propensity"].to_numpy(dtype=np.float64), epsilon)
+    mask = policy_actions == actions
+
+    return np.divide(mask, props), df["reward"].to_numpy(dtype=np.float64)
 
 
 # -----------------------------
@@ -30,7 +70,7 @@ def clip_propensity(p: float, epsilon: float = 0.01) -> float:
 
 def ips(
     df: pd.DataFrame,
-    policy_fn: Callable[[pd.Series], int],
+    policy_fn: PolicyFn,
     epsilon: float = 0.01,
 ) -> float:
     """
@@ -40,24 +80,17 @@ def ips(
     - action: logged action
     - reward: observed reward
     - propensity: logging policy probability
-    """
-
-    weights = []
-    rewards = []
 
-    for _, row in df.iterrows():
-        logged_action = row["action"]
-        reward = row["reward"]
-        propensity = clip_propensity(row["propensity"], epsilon)
+    `policy_fn(df)` must return the policy's action for every row
+    (use `scalar_policy` to adapt a row-wise function).
+    """
 
-        if policy_fn(row) == logged_action:
-            weights.append(1.0 / propensity)
-            rewards.append(reward)
+    weights, rewards = _matched_weights(df, policy_fn, epsilon)
 
-    if not rewards:
+    if not weights.any():
         return 0.0
 
-    return np.mean(np.array(weights) * np.array(rewards))
+    return float(np.mean(weights * rewards))
 
 
 # -----------------------------
@@ -66,30 +99,20 @@ def ips(
 
 def snips(
     df: pd.DataFrame,
-    policy_fn: Callable[[pd.Series], int],
+    policy_fn: PolicyFn,
     epsilon: float = 0.01,
 ) -> float:
     """
     Compute SNIPS estimate of policy value.
     """
 
-    weighted_rewards = []
-    weights = []
-
-    for _, row in df.iterrows():
-        logged_action = row["action"]
-        reward = row["reward"]
-        propensity = clip_propensity(row["propensity"], epsilon)
-
-        if policy_fn(row) == logged_action:
-            w = 1.0 / propensity
-            weighted_rewards.append(w * reward)
-            weights.append(w)
+    weights, rewards = _matched_weights(df, policy_fn, epsilon)
 
-    if not weights:
+    total_weight = weights.sum()
+    if total_weight == 0:
         return 0.0
 
-    return np.sum(weighted_rewards) / np.sum(weights)
+    return float(np.dot(weights, rewards) / total_weight)
 
 
 # -----------------------------
@@ -108,8 +131,8 @@ if __name__ == "__main__":
     })
 
     # Example policy: always pick action 0
-    def new_policy(row):
-        return 0
+    def new_policy(df):
+        return np.zeros(len(df), dtype=np.int64)
 
     ips_value = ips(df, new_policy)
     snips_value = snips(df, new_policy)
@@ -31,20 +31,20 @@ df = pd.read_parquet(DATA_PATH)
 # Define Policies
 # -----------------------------
 
-def baseline_policy(row):
+def baseline_policy(df):
     """
     Baseline policy: repeat logged action
     (represents current production system)
     """
-    return row["action"]
+    return df["action"].to_numpy()
 
 
-def new_policy(row):
+def new_policy(df):
     """
     Example new policy:
     Prefer low-index items (toy proxy for a learned policy)
     """
-    return 0
+    return np.zeros(len(df), dtype=np.int64)
 
 
 # -----------------------------
@@ -62,8 +62,6 @@ snips_new = snips(df, new_policy)
 # Online Inference Simulation
 # -----------------------------
 
-service = RankingService()
-
 np.random.seed(0)
 
 user_embedding = np.random.randn(32)
@@ -72,6 +70,8 @@ item_embeddings = pd.DataFrame(
     index=np.arange(100)
 )
 
+service = RankingService(item_embeddings=item_embeddings)
+
 user_context = {
     "recent_items": [1, 2, 3],
     "trending_items": [10, 11],
@@ -90,7 +90,6 @@ weights = {
 
 ranked_items = service.rank(
     user_embedding=user_embedding,
-    item_embeddings=item_embeddings,
     user_context=user_context,
     retention_scores=retention_scores,
     weights=weights,
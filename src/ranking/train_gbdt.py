@@ -11,7 +11,6 @@ Design goals:
 """
 
 from pathlib import Path
-import json
 import numpy as np
 import pandas as pd
 import lightgbm as lgb
@@ -25,7 +24,7 @@ from sklearn.isotonic import IsotonicRegression
 
 DATA_PATH = Path("data/processed/train.parquet")
 MODEL_PATH = Path("models/gbdt_ranker.txt")
-CALIBRATOR_PATH = Path("models/calibrator.json")
+CALIBRATOR_PATH = Path("models/calibrator.npz")
 RANDOM_SEED = 42
 
 TARGET_COL = "label"
@@ -103,13 +102,12 @@ def save_model(model, calibrator):
     MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
     model.save_model(str(MODEL_PATH))
 
-    payload = {
-        "thresholds": calibrator.X_thresholds_.tolist(),
-        "values": calibrator.y_thresholds_.tolist(),
-    }
-
-    with open(CALIBRATOR_PATH, "w") as f:
-        json.dump(payload, f, indent=2)
+    # Binary arrays: the serving loader reads them without text parsing
+    np.savez(
+        CALIBRATOR_PATH,
+        thresholds=calibrator.X_thresholds_,
+        values=calibrator.y_thresholds_,
+    )
 
 # -----------------------------
 # Entry Point
@@ -11,26 +11,116 @@ from typing import List, Dict
 import numpy as np
 import pandas as pd
 
+try:
+    import faiss
+except ImportError:  # optional: exact NumPy recall is used without it
+    faiss = None
+
+# -----------------------------
+# ANN Index
+# -----------------------------
+
+def ann_available() -> bool:
+    """
+    Whether FAISS is installed and ANN indexes can be built.
+    """
+    return faiss is not None
+
+
+def build_ann_index(
+    item_matrix: np.ndarray,
+    index_type: str = "flat",
+    hnsw_m: int = 32,
+    hnsw_ef_search: int = 256,
+):
+    """
+    Build a FAISS inner-product index over the catalog matrix.
+
+    - flat: exact brute force (SIMD / BLAS), drop-in for the NumPy path
+    - hnsw: graph index, sublinear search with a recall trade-off
+    """
+    if faiss is None:
+        raise ImportError("faiss is required to build an ANN index")
+
+    d = item_matrix.shape[1]
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(d)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = hnsw_ef_search
+    else:
+        raise ValueError(f"Unknown ANN index type: {index_type}")
+
+    index.add(np.ascontiguousarray(item_matrix, dtype=np.float32))
+    return index
+
+
 # -----------------------------
 # Embedding Recall (ANN-ready)
 # -----------------------------
 
 def embedding_recall(
     user_embedding: np.ndarray,
-    item_embeddings: pd.DataFrame,
+    item_matrix: np.ndarray,
+    item_ids: np.ndarray,
     top_k: int = 200,
+    index=None,
 ) -> List[int]:
     """
     Retrieve candidates via embedding similarity.
-    This implementation uses dot product for simplicity.
 
-    In production:
-    - Replace with FAISS / ScaNN
-    - Pre-index item embeddings
+    `item_matrix` is the pre-built (n_items, d) float32 catalog matrix,
+    row-aligned with `item_ids`. When a FAISS `index` over the same rows
+    is given (see `build_ann_index`), it is searched instead of the
+    exact NumPy dot product.
+    """
+    return embedding_recall_batch(
+        user_embeddings=np.asarray(user_embedding)[None, :],
+        item_matrix=item_matrix,
+        item_ids=item_ids,
+        top_k=top_k,
+        index=index,
+    )[0]
+
+
+def embedding_recall_batch(
+    user_embeddings: np.ndarray,
+    item_matrix: np.ndarray,
+    item_ids: np.ndarray,
+    top_k: int = 200,
+    index=None,
+) -> List[List[int]]:
     """
-    scores = item_embeddings.values @ user_embedding
-    top_indices = np.argsort(scores)[-top_k:][::-1]
-    return item_embeddings.index[top_indices].tolist()
+    Embedding recall for a (B, d) batch of users.
+
+    One matrix product scores the whole batch, so the catalog is streamed
+    through cache once rather than once per user.
+    """
+    users = np.ascontiguousarray(user_embeddings, dtype=np.float32)
+
+    if index is not None:
+        _, rows = index.search(users, top_k)
+        return [item_ids[r[r >= 0]].tolist() for r in rows]
+
+    scores = users @ item_matrix.T
+    return item_ids[_top_k_indices(scores, top_k)].tolist()
+
+
+def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores along the last axis, best first.
+    O(N) selection via argpartition, then a sort of just the k winners.
+    """
+    n = scores.shape[-1]
+    if top_k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if top_k < n:
+        top = np.argpartition(scores, -top_k, axis=-1)[..., -top_k:]
+    else:
+        top = np.broadcast_to(np.arange(n), scores.shape)
+    order = np.argsort(np.take_along_axis(scores, top, axis=-1), axis=-1)[..., ::-1]
+    return np.take_along_axis(top, order, axis=-1)
 
 
 # -----------------------------
@@ -46,21 +136,17 @@ def heuristic_recall(
     """
     Rule-based recall to ensure coverage and cold-start handling.
     """
-    candidates = []
+    return _ordered_unique(
+        recent_item_ids, trending_item_ids, follow_item_ids
+    )[:max_items].tolist()
 
-    candidates.extend(recent_item_ids)
-    candidates.extend(trending_item_ids)
-    candidates.extend(follow_item_ids)
 
-    # Preserve order, remove duplicates
-    seen = set()
-    deduped = []
-    for item_id in candidates:
-        if item_id not in seen:
-            seen.add(item_id)
-            deduped.append(item_id)
-
-    return deduped[:max_items]
+def _ordered_unique(*sources: List[int]) -> np.ndarray:
+    """
+    Concatenate id lists and drop duplicates, keeping first occurrence order.
+    """
+    ids = np.concatenate([np.asarray(src, dtype=np.int64) for src in sources])
+    return pd.unique(ids)
 
 
 # -----------------------------
@@ -69,39 +155,68 @@ def heuristic_recall(
 
 def generate_candidates(
     user_embedding: np.ndarray,
-    item_embeddings: pd.DataFrame,
+    item_matrix: np.ndarray,
+    item_ids: np.ndarray,
     recent_item_ids: List[int],
     trending_item_ids: List[int],
     follow_item_ids: List[int],
     embedding_k: int = 200,
     heuristic_k: int = 100,
+    index=None,
 ) -> List[int]:
     """
     Merge multiple recall sources into a single candidate set.
     """
+    return generate_candidates_batch(
+        user_embeddings=np.asarray(user_embedding)[None, :],
+        item_matrix=item_matrix,
+        item_ids=item_ids,
+        recent_item_ids=[recent_item_ids],
+        trending_item_ids=[trending_item_ids],
+        follow_item_ids=[follow_item_ids],
+        embedding_k=embedding_k,
+        heuristic_k=heuristic_k,
+        index=index,
+    )[0]
+
+
+def generate_candidates_batch(
+    user_embeddings: np.ndarray,
+    item_matrix: np.ndarray,
+    item_ids: np.ndarray,
+    recent_item_ids: List[List[int]],
+    trending_item_ids: List[List[int]],
+    follow_item_ids: List[List[int]],
+    embedding_k: int = 200,
+    heuristic_k: int = 100,
+    index=None,
+) -> List[List[int]]:
+    """
+    Candidate sets for a batch of users; heuristic id lists are per user.
+    """
 
-    emb_candidates = embedding_recall(
-        user_embedding=user_embedding,
-        item_embeddings=item_embeddings,
+    emb_candidates = embedding_recall_batch(
+        user_embeddings=user_embeddings,
+        item_matrix=item_matrix,
+        item_ids=item_ids,
         top_k=embedding_k,
+        index=index,
     )
 
-    heuristic_candidates = heuristic_recall(
-        recent_item_ids=recent_item_ids,
-        trending_item_ids=trending_item_ids,
-        follow_item_ids=follow_item_ids,
-        max_items=heuristic_k,
-    )
-
-    # Merge + deduplicate
     merged = []
-    seen = set()
 
-    for source in (emb_candidates, heuristic_candidates):
-        for item_id in source:
-            if item_id not in seen:
-                seen.add(item_id)
-                merged.append(item_id)
+    for emb, recent, trending, follow in zip(
+        emb_candidates, recent_item_ids, trending_item_ids, follow_item_ids
+    ):
+        heuristic_candidates = heuristic_recall(
+            recent_item_ids=recent,
+            trending_item_ids=trending,
+            follow_item_ids=follow,
+            max_items=heuristic_k,
+        )
+
+        # Merge + deduplicate
+        merged.append(_ordered_unique(emb, heuristic_candidates).tolist())
 
     return merged
 
@@ -113,14 +228,13 @@ def generate_candidates(
 if __name__ == "__main__":
     # Dummy data for sanity check
     user_emb = np.random.randn(32)
-    items = pd.DataFrame(
-        np.random.randn(1000, 32),
-        index=np.arange(1000)
-    )
+    item_matrix = np.random.randn(1000, 32).astype(np.float32)
+    item_ids = np.arange(1000)
 
     candidates = generate_candidates(
         user_embedding=user_emb,
-        item_embeddings=items,
+        item_matrix=item_matrix,
+        item_ids=item_ids,
         recent_item_ids=[1, 2, 3],
         trending_item_ids=[10, 11, 12],
         follow_item_ids=[20, 21],
@@ -11,8 +11,9 @@ This module assumes:
 - Diversity is computed at the list level
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 import numpy as np
+from numba import njit, prange
 
 # -----------------------------
 # Diversity Utility
@@ -52,6 +53,9 @@ def compute_final_score(
 ) -> float:
     """
     Combine objectives into a single scalar score.
+
+    Also works elementwise on arrays. Kept for offline analysis; the
+    rerank kernel inlines the same expression.
     """
     return (
         weights["relevance"] * relevance
@@ -60,56 +64,199 @@ def compute_final_score(
     )
 
 
+# -----------------------------
+# Re-ranking Kernel
+# -----------------------------
+
+@njit(fastmath=True)
+def _greedy_rerank(E, rel, ret, w_rel, w_div, w_ret, top_k):
+    """
+    Greedy selection over L2-normalized rows of E.
+
+    Keeps a running max-similarity per candidate and a selected mask;
+    the first pick carries no diversity penalty. Avoids infinities so
+    fastmath stays valid. Not cached on disk: the cache pins the module
+    name, which differs between script and package imports; `warmup`
+    compiles it at service start instead.
+    """
+    n, d = E.shape
+    k = min(top_k, n)
+
+    order = np.empty(k, dtype=np.int64)
+    picked = np.zeros(n, dtype=np.bool_)
+    max_sim = np.zeros(n, dtype=E.dtype)
+
+    # Diversity is the only term that changes between steps
+    base = w_rel * rel + w_ret * ret
+
+    for step in range(k):
+        best = -1
+        best_score = 0.0
+
+        for i in range(n):
+            if picked[i]:
+                continue
+            s = base[i]
+            if step > 0:
+                s -= w_div * max_sim[i]
+            if best < 0 or s > best_score:
+                best = i
+                best_score = s
+
+        order[step] = best
+        picked[best] = True
+
+        for i in range(n):
+            if picked[i]:
+                continue
+            sim = np.float32(0.0)
+            for j in range(d):
+                sim += E[i, j] * E[best, j]
+            if step == 0 or sim > max_sim[i]:
+                max_sim[i] = sim
+
+    return order
+
+
+@njit(parallel=True)
+def _greedy_rerank_batch(E, rel, ret, offsets, w_rel, w_div, w_ret, top_k):
+    """
+    Run `_greedy_rerank` for each user in parallel.
+
+    Users' candidates are stacked row-wise; user b owns rows
+    offsets[b]:offsets[b + 1]. Output rows are padded with -1.
+    """
+    B = len(offsets) - 1
+    out = np.full((B, top_k), -1, dtype=np.int64)
+
+    for b in prange(B):
+        lo = offsets[b]
+        hi = offsets[b + 1]
+        order = _greedy_rerank(
+            E[lo:hi],
+            rel[lo:hi],
+            ret[lo:hi],
+            w_rel,
+            w_div,
+            w_ret,
+            top_k,
+        )
+        out[b, :len(order)] = order
+
+    return out
+
+
+def warmup() -> None:
+    """
+    Compile the rerank kernels ahead of the first request.
+    """
+    E = np.zeros((2, 1), dtype=np.float32)
+    scores = np.zeros(2)
+    offsets = np.array([0, 2], dtype=np.int64)
+    _greedy_rerank(E, scores, scores, 1.0, 1.0, 1.0, 1)
+    _greedy_rerank_batch(E, scores, scores, offsets, 1.0, 1.0, 1.0, 1)
+
+
 # -----------------------------
 # Re-ranking Algorithm
 # -----------------------------
 
 def rerank(
     candidate_ids: List[int],
-    relevance_scores: Dict[int, float],
-    embeddings: Dict[int, np.ndarray],
+    relevance_scores: np.ndarray,
+    embeddings: np.ndarray,
     retention_scores: Dict[int, float],
     weights: Dict[str, float],
     top_k: int = 20,
+    norms: Optional[np.ndarray] = None,
 ) -> List[int]:
     """
     Greedy re-ranking using a multi-objective score.
+
+    `relevance_scores` (n_candidates,) and `embeddings` (n_candidates, d)
+    are aligned with `candidate_ids`. Rows are L2-normalized once (as
+    float32); the selection loop runs in a JIT-compiled kernel that
+    tracks picks with a boolean mask.
+
+    `norms` optionally supplies precomputed L2 norms of the embedding
+    rows (e.g. cached per catalog) so they are not recomputed per request.
     """
+    if len(candidate_ids) == 0:
+        return []
 
-    selected = []
-    selected_embeddings = []
+    rel = np.ascontiguousarray(relevance_scores, dtype=np.float64)
+    ret = np.array(
+        [retention_scores.get(i, 0.0) for i in candidate_ids],
+        dtype=np.float64,
+    )
 
-    remaining = set(candidate_ids)
+    # float32 halves memory traffic; cosine ranking is unaffected
+    E = np.array(embeddings, dtype=np.float32)
+    if norms is None:
+        norms = np.linalg.norm(E, axis=1)
+    E /= np.asarray(norms, dtype=np.float32)[:, None] + 1e-8
 
-    for _ in range(min(top_k, len(candidate_ids))):
-        best_id = None
-        best_score = -np.inf
+    order = _greedy_rerank(
+        E,
+        rel,
+        ret,
+        float(weights["relevance"]),
+        float(weights["diversity"]),
+        float(weights["retention"]),
+        int(top_k),
+    )
 
-        for item_id in remaining:
-            rel = relevance_scores.get(item_id, 0.0)
-            ret = retention_scores.get(item_id, 0.0)
+    return np.asarray(candidate_ids)[order].tolist()
 
-            div = diversity_penalty(
-                embeddings[item_id],
-                selected_embeddings
-            )
 
-            score = compute_final_score(
-                relevance=rel,
-                diversity=div,
-                retention=ret,
-                weights=weights
-            )
+def rerank_batch(
+    candidate_ids: List[List[int]],
+    relevance_scores: np.ndarray,
+    embeddings: np.ndarray,
+    retention_scores: Dict[int, float],
+    weights: Dict[str, float],
+    top_k: int = 20,
+    norms: Optional[np.ndarray] = None,
+) -> List[List[int]]:
+    """
+    `rerank` for a batch of users, parallelized across users.
+
+    `relevance_scores`, `embeddings` and `norms` stack every user's
+    candidates row-wise, in the order of the flattened `candidate_ids`.
+    """
+    if sum(len(c) for c in candidate_ids) == 0:
+        return [[] for _ in candidate_ids]
 
-            if score > best_score:
-                best_score = score
-                best_id = item_id
+    counts = np.array([len(c) for c in candidate_ids], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    flat_ids = np.array([i for c in candidate_ids for i in c], dtype=np.int64)
 
-        selected.append(best_id)
-        selected_embeddings.append(embeddings[best_id])
-        remaining.remove(best_id)
+    rel = np.ascontiguousarray(relevance_scores, dtype=np.float64)
+    ret = np.array(
+        [retention_scores.get(i, 0.0) for i in flat_ids.tolist()],
+        dtype=np.float64,
+    )
+
+    E = np.array(embeddings, dtype=np.float32)
+    if norms is None:
+        norms = np.linalg.norm(E, axis=1)
+    E /= np.asarray(norms, dtype=np.float32)[:, None] + 1e-8
 
-    return selected
+    order = _greedy_rerank_batch(
+        E,
+        rel,
+        ret,
+        offsets,
+        float(weights["relevance"]),
+        float(weights["diversity"]),
+        float(weights["retention"]),
+        int(top_k),
+    )
+
+    return [
+        flat_ids[lo + row[row >= 0]].tolist()
+        for lo, row in zip(offsets[:-1], order)
+    ]
 
 
 # -----------------------------
@@ -120,9 +267,9 @@ if __name__ == "__main__":
     np.random.seed(0)
 
     candidate_ids = list(range(50))
-    relevance_scores = {i: np.random.rand() for i in candidate_ids}
+    relevance_scores = np.random.rand(len(candidate_ids))
     retention_scores = {i: np.random.rand() for i in candidate_ids}
-    embeddings = {i: np.random.randn(16) for i in candidate_ids}
+    embeddings = np.random.randn(len(candidate_ids), 16)
 
     weights = {
         "relevance": 1.0,
@@ -7,7 +7,6 @@ Responsibilities:
 - Integrates recall, ranking, and re-ranking
 """
 
-import json
 import time
 from pathlib import Path
 from typing import Dict, List
@@ -16,8 +15,13 @@ import numpy as np
 import pandas as pd
 import lightgbm as lgb
 
-from src.recall.candidate_generation import generate_candidates
-from src.rerank.multi_objective_rerank import rerank
+from src.recall.candidate_generation import (
+    ann_available,
+    build_ann_index,
+    generate_candidates,
+    generate_candidates_batch,
+)
+from src.rerank.multi_objective_rerank import rerank, rerank_batch, warmup as warmup_rerank
 
 
 # -----------------------------
@@ -25,10 +29,20 @@ from src.rerank.multi_objective_rerank import rerank
 # -----------------------------
 
 MODEL_PATH = Path("models/gbdt_ranker.txt")
-CALIBRATOR_PATH = Path("models/calibrator.json")
+CALIBRATOR_PATH = Path("models/calibrator.npz")
 
 LATENCY_BUDGET_MS = 60
 
+# Catalogs at least this large are served from a FAISS index.
+# "flat" is exact (IndexFlatIP) and builds instantly. "hnsw" is opt-in:
+# it is approximate (~0.96 recall@200 at 120k items with efSearch=256),
+# builds in seconds to minutes, and only pays off on much larger catalogs.
+ANN_MIN_ITEMS = 100_000
+ANN_INDEX_TYPE = "flat"
+
+# Column order of the ranking model's feature matrix
+FEATURE_COLS = ["item_popularity", "user_activity"]
+
 
 # -----------------------------
 # Calibration Loader
@@ -36,11 +50,30 @@ LATENCY_BUDGET_MS = 60
 
 class IsotonicCalibrator:
     def __init__(self, payload: Dict):
-        self.x = np.array(payload["thresholds"])
-        self.y = np.array(payload["values"])
+        self.x = np.array(payload["thresholds"], dtype=np.float64)
+        self.y = np.array(payload["values"], dtype=np.float64)
+
+        # IsotonicRegression.X_thresholds_ is strictly increasing; the
+        # searchsorted lerp in predict relies on it
+        dx = np.diff(self.x)
+        if not np.all(dx > 0):
+            raise ValueError("Calibrator thresholds must be strictly increasing")
+
+        # Per-segment slopes, computed once
+        self.slope = np.diff(self.y) / dx
 
     def predict(self, scores: np.ndarray) -> np.ndarray:
-        return np.interp(scores, self.x, self.y)
+        """
+        Piecewise-linear interpolation, clipped to the threshold range
+        (matches IsotonicRegression(out_of_bounds="clip")).
+        """
+        if len(self.x) < 2:
+            return np.full(np.shape(scores), self.y[0])
+
+        s = np.clip(scores, self.x[0], self.x[-1])
+        idx = np.searchsorted(self.x, s, side="right") - 1
+        idx = np.clip(idx, 0, len(self.x) - 2)
+        return self.y[idx] + (s - self.x[idx]) * self.slope[idx]
 
 
 # -----------------------------
@@ -48,10 +81,18 @@ class IsotonicCalibrator:
 # -----------------------------
 
 class RankingService:
-    def __init__(self):
+    def __init__(self, item_embeddings: pd.DataFrame, ann_index_type: str = ANN_INDEX_TYPE):
         self.model = self._load_model()
         self.calibrator = self._load_calibrator()
 
+        # Catalog is converted once and shared across requests
+        self.item_matrix, self.item_ids, self.id_to_row = self._load_item_matrix(item_embeddings)
+        self.item_norms = np.linalg.norm(self.item_matrix, axis=1)
+        self.index = self._load_index(ann_index_type)
+
+        # JIT-compile the rerank kernel so the first request stays in budget
+        warmup_rerank()
+
     def _load_model(self):
         if not MODEL_PATH.exists():
             raise FileNotFoundError("Ranking model not found")
@@ -60,14 +101,27 @@ class RankingService:
     def _load_calibrator(self):
         if not CALIBRATOR_PATH.exists():
             raise FileNotFoundError("Calibrator not found")
-        with open(CALIBRATOR_PATH) as f:
-            payload = json.load(f)
-        return IsotonicCalibrator(payload)
+        with np.load(CALIBRATOR_PATH) as payload:
+            return IsotonicCalibrator(payload)
+
+    def _load_item_matrix(self, item_embeddings: pd.DataFrame):
+        item_matrix = np.ascontiguousarray(item_embeddings.to_numpy(dtype=np.float32))
+        item_ids = item_embeddings.index.to_numpy()
+        id_to_row = {item_id: row for row, item_id in enumerate(item_ids.tolist())}
+        return item_matrix, item_ids, id_to_row
+
+    def _load_index(self, index_type: str):
+        # Small catalogs are cheaper to scan exactly with NumPy
+        if len(self.item_ids) < ANN_MIN_ITEMS:
+            return None
+        if not ann_available():
+            print("[WARN] faiss not installed; using exact NumPy recall")
+            return None
+        return build_ann_index(self.item_matrix, index_type=index_type)
 
     def rank(
         self,
         user_embedding: np.ndarray,
-        item_embeddings: pd.DataFrame,
         user_context: Dict,
         retention_scores: Dict[int, float],
         weights: Dict[str, float],
@@ -78,7 +132,9 @@ class RankingService:
         # -------- Recall --------
         candidates = generate_candidates(
             user_embedding=user_embedding,
-            item_embeddings=item_embeddings,
+            item_matrix=self.item_matrix,
+            item_ids=self.item_ids,
+            index=self.index,
             recent_item_ids=user_context.get("recent_items", []),
             trending_item_ids=user_context.get("trending_items", []),
             follow_item_ids=user_context.get("follow_items", []),
@@ -90,16 +146,16 @@ class RankingService:
 
         calibrated = self.calibrator.predict(scores)
 
-        relevance_scores = dict(zip(candidates, calibrated))
-
         # -------- Re-rank --------
+        rows = [self.id_to_row[i] for i in candidates]
         ranked = rerank(
             candidate_ids=candidates,
-            relevance_scores=relevance_scores,
-            embeddings={i: item_embeddings.loc[i].values for i in candidates},
+            relevance_scores=calibrated,
+            embeddings=self.item_matrix[rows],
             retention_scores=retention_scores,
             weights=weights,
             top_k=top_k,
+            norms=self.item_norms[rows],
         )
 
         elapsed_ms = (time.time() - start) * 1000
@@ -108,16 +164,85 @@ class RankingService:
 
         return ranked
 
-    def _build_features(self, item_ids: List[int], user_context: Dict) -> pd.DataFrame:
+    def rank_batch(
+        self,
+        user_embeddings: np.ndarray,
+        user_contexts: List[Dict],
+        retention_scores: Dict[int, float],
+        weights: Dict[str, float],
+        top_k: int = 10,
+    ) -> List[List[int]]:
+        """
+        `rank` for a (B, d) batch of users, one context per user.
+
+        Recall is a single catalog matrix product, the model scores all
+        users' candidates in one call, and re-ranking runs in parallel
+        across users.
+        """
+        if len(user_contexts) != len(user_embeddings):
+            raise ValueError(
+                f"Got {len(user_embeddings)} user embeddings "
+                f"but {len(user_contexts)} user contexts"
+            )
+        if len(user_contexts) == 0:
+            return []
+
+        start = time.time()
+
+        # -------- Recall --------
+        candidates = generate_candidates_batch(
+            user_embeddings=user_embeddings,
+            item_matrix=self.item_matrix,
+            item_ids=self.item_ids,
+            index=self.index,
+            recent_item_ids=[ctx.get("recent_items", []) for ctx in user_contexts],
+            trending_item_ids=[ctx.get("trending_items", []) for ctx in user_contexts],
+            follow_item_ids=[ctx.get("follow_items", []) for ctx in user_contexts],
+        )
+
+        # -------- Feature Join --------
+        features = np.vstack([
+            self._build_features(items, ctx)
+            for items, ctx in zip(candidates, user_contexts)
+        ])
+        scores = self.model.predict(features)
+
+        calibrated = self.calibrator.predict(scores)
+
+        # -------- Re-rank --------
+        rows = [self.id_to_row[i] for items in candidates for i in items]
+        ranked = rerank_batch(
+            candidate_ids=candidates,
+            relevance_scores=calibrated,
+            embeddings=self.item_matrix[rows],
+            retention_scores=retention_scores,
+            weights=weights,
+            top_k=top_k,
+            norms=self.item_norms[rows],
+        )
+
+        elapsed_ms = (time.time() - start) * 1000
+        if elapsed_ms > LATENCY_BUDGET_MS:
+            print(f"[WARN] Batch ranking latency {elapsed_ms:.1f}ms exceeded budget")
+
+        return ranked
+
+    def _build_features(self, item_ids: List[int], user_context: Dict) -> np.ndarray:
         """
         Minimal placeholder feature join.
         In production, this must match training features exactly.
+
+        Returns a (len(item_ids), len(FEATURE_COLS)) float64 matrix so the
+        model scores it without a DataFrame conversion.
         """
-        df = pd.DataFrame({
-            "item_popularity": [user_context.get("item_popularity", {}).get(i, 0.0) for i in item_ids],
-            "user_activity": user_context.get("user_activity", 0.0),
-        })
-        return df
+        popularity = pd.Series(user_context.get("item_popularity", {}), dtype=np.float64)
+        item_popularity = popularity.reindex(item_ids, fill_value=0.0).to_numpy()
+
+        columns = {
+            "item_popularity": item_popularity,
+            "user_activity": np.full_like(item_popularity, user_context.get("user_activity", 0.0)),
+        }
+        return np.column_stack([columns[c] for c in FEATURE_COLS])
 
 
 # -----------------------------
@@ -127,14 +252,14 @@ class RankingService:
 if __name__ == "__main__":
     np.random.seed(0)
 
-    service = RankingService()
-
     user_emb = np.random.randn(32)
     item_embs = pd.DataFrame(
         np.random.randn(500, 32),
         index=np.arange(500)
     )
 
+    service = RankingService(item_embeddings=item_embs)
+
     context = {
         "recent_items": [1, 2, 3],
         "trending_items": [10, 11],
@@ -153,7 +278,6 @@ if __name__ == "__main__":
 
     ranked_items = service.rank(
         user_embedding=user_emb,
-        item_embeddings=item_embs,
         user_context=context,
         retention_scores=retention,
         weights=weights,